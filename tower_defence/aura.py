@@ -0,0 +1,58 @@
+from dataclasses import dataclass
+
+from field import FIELD_WIDTH, FIELD_HEIGHT
+
+
+# Enemies never slow down past this fraction of their speed
+MIN_SPEED_MULTIPLIER = 0.2
+
+
+@dataclass
+class AuraGrid:
+    # Flat per tile arrays indexed by y * FIELD_WIDTH + x
+    # Sum of every slow covering the tile
+    slow: list[float]
+    # Damage per tick dealt to enemies on the tile
+    damage: list[float]
+    # Extra damage fraction for towers on the tile
+    buff: list[float]
+    # Derived from slow whenever a tile is stamped
+    speed_multiplier: list[float]
+
+
+def new_aura_grid() -> AuraGrid:
+    size = FIELD_WIDTH * FIELD_HEIGHT
+    return AuraGrid([0.0] * size, [0.0] * size, [0.0] * size, [1.0] * size)
+
+
+def get_tile_index(x: float, y: float) -> int:
+    # Nearest tile to a (possibly fractional) field position
+    return int(y + 0.5) * FIELD_WIDTH + int(x + 0.5)
+
+
+def stamp_aura(
+    aura_grid: AuraGrid,
+    x: int,
+    y: int,
+    radius: float,
+    slow: float,
+    damage: float,
+    buff: float,
+    sign: int = 1,
+) -> None:
+    # Adds an aura to every tile whose center is within radius of (x, y)
+    # Call again with sign = -1 to remove it
+    radius_squared = radius * radius
+    reach = int(radius)
+    for tile_y in range(max(0, y - reach), min(FIELD_HEIGHT, y + reach + 1)):
+        for tile_x in range(max(0, x - reach), min(FIELD_WIDTH, x + reach + 1)):
+            if (tile_x - x) ** 2 + (tile_y - y) ** 2 > radius_squared:
+                continue
+
+            i = tile_y * FIELD_WIDTH + tile_x
+            aura_grid.slow[i] += sign * slow
+            aura_grid.damage[i] += sign * damage
+            aura_grid.buff[i] += sign * buff
+            aura_grid.speed_multiplier[i] = max(
+                MIN_SPEED_MULTIPLIER, 1 - aura_grid.slow[i]
+            )
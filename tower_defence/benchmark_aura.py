@@ -0,0 +1,108 @@
+import argparse
+import random
+import time
+
+from aura import MIN_SPEED_MULTIPLIER, new_aura_grid
+from entity import EntityRegistry
+from field import FIELD_WIDTH, FIELD_HEIGHT, Direction, Tile, recalculate_flow_field
+from tower import TOWER_AURA_TABLE, TowerMap, place_tower, remove_tower
+from enemy import EnemyList, EnemyType, spawn_enemy, update_enemies
+from player import Player
+
+
+AURA_TOWER_TYPES = list(TOWER_AURA_TABLE)
+
+
+# What update_enemies would cost without the grid, every enemy checks the
+# distance to every aura tower each tick
+def naive_aura_pass(tower_map: TowerMap, enemies: EnemyList) -> list[float]:
+    speed_multipliers = []
+    for enemy in enemies:
+        slow = 0
+        damage = 0
+        for (x, y), tower in tower_map.items():
+            if (enemy.x - x) ** 2 + (enemy.y - y) ** 2 <= tower.range**2:
+                tower_slow, tower_damage, _ = TOWER_AURA_TABLE[tower.tower_type]
+                slow += tower_slow
+                damage += tower_damage
+        enemy.health -= damage
+        speed_multipliers.append(max(MIN_SPEED_MULTIPLIER, 1 - slow))
+
+    return speed_multipliers
+
+
+def benchmark(enemy_count: int, ticks: int) -> None:
+    random.seed(0)
+    player = Player(0, 0)
+    tower_map: TowerMap = {}
+    aura_grid = new_aura_grid()
+    registry = EntityRegistry()
+    enemies: EnemyList = []
+
+    start = (0, FIELD_HEIGHT // 2)
+    end = (FIELD_WIDTH - 1, FIELD_HEIGHT // 2)
+    field = [[Tile.EMPTY for x in range(FIELD_WIDTH)] for y in range(FIELD_HEIGHT)]
+    flow_field = [
+        [Direction.NONE for x in range(FIELD_WIDTH)] for y in range(FIELD_HEIGHT)
+    ]
+
+    # Fill every tile off the middle three rows with aura towers
+    tiles = [
+        (x, y)
+        for y in range(FIELD_HEIGHT)
+        for x in range(FIELD_WIDTH)
+        if abs(y - start[1]) > 1
+    ]
+    timer = time.perf_counter()
+    for x, y in tiles:
+        place_tower(
+            x, y, random.choice(AURA_TOWER_TYPES), field, tower_map, player, aura_grid
+        )
+    place_time = time.perf_counter() - timer
+
+    # Removing and placing every tower again measures the stamp both ways
+    timer = time.perf_counter()
+    for x, y in tiles:
+        tower_type = tower_map[(x, y)].tower_type
+        remove_tower(x, y, field, tower_map, player, aura_grid)
+        place_tower(x, y, tower_type, field, tower_map, player, aura_grid)
+    restamp_time = time.perf_counter() - timer
+
+    recalculate_flow_field(field, flow_field, start, end)
+    for _ in range(enemy_count):
+        # Far enough from the end that nobody leaves during the benchmark
+        spawn = (random.randrange(FIELD_WIDTH - 5), start[1] + random.randint(-1, 1))
+        spawn_enemy(
+            spawn, random.choice(list(EnemyType)), enemies, registry, flow_field
+        )
+    for enemy in enemies:
+        enemy.health = float("inf")  # Keep every enemy alive
+
+    timer = time.perf_counter()
+    for _ in range(ticks):
+        update_enemies(enemies, registry, player, flow_field, end, aura_grid)
+    grid_time = (time.perf_counter() - timer) / ticks
+
+    timer = time.perf_counter()
+    naive_aura_pass(tower_map, enemies)
+    naive_time = time.perf_counter() - timer
+
+    print(f"Aura towers: {len(tower_map)}")
+    print(f"Enemies: {len(enemies)}")
+    print(f"Place: {place_time / len(tiles) * 1e6:.1f} us per tower")
+    print(f"Remove and place: {restamp_time / len(tiles) * 1e6:.1f} us per tower")
+    print(f"update_enemies with aura grid: {grid_time * 1000:.2f} ms per tick")
+    print(f"Naive aura distance checks alone: {naive_time * 1000:.2f} ms per tick")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the aura grid")
+    parser.add_argument("--enemies", type=int, default=5000)
+    parser.add_argument("--ticks", type=int, default=60)
+    args = parser.parse_args()
+
+    benchmark(args.enemies, args.ticks)
+
+
+if __name__ == "__main__":
+    main()
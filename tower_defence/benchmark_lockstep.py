@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import statistics
+
+from field import FIELD_HEIGHT
+from tower import TowerType
+from enemy import EnemyType
+from lockstep import (
+    Opcode,
+    Server,
+    connect,
+    handle_connection,
+    new_game_state,
+    run_client,
+    send_command,
+    server_tick,
+    state_checksum,
+)
+
+
+# Two players defend the same field over loopback. Player 0 builds a wall of
+# towers, player 1 floods the field with enemies, and the server reports how
+# many bytes and how much latency each tick costs. The wall keeps killing, so
+# the spawner tops heavy waves back up to the requested enemy count each tick.
+async def benchmark(
+    ticks: int, enemies: int, tick_interval: float, slow_client_delay: float
+) -> None:
+    server = Server(new_game_state())
+    listener = await asyncio.start_server(
+        lambda reader, writer: handle_connection(server, reader, writer),
+        "127.0.0.1",
+        0,
+    )
+    port = listener.sockets[0].getsockname()[1]
+
+    builder = await connect("127.0.0.1", port)
+    spawner = await connect("127.0.0.1", port, slow_client_delay)
+    clients = [builder, spawner]
+    tasks = [asyncio.create_task(run_client(client)) for client in clients]
+
+    # Let both clients receive their initial state
+    while any(client.state is None for client in clients):
+        await asyncio.sleep(tick_interval)
+
+    send_command(builder, (Opcode.SELECT, TowerType.HEAVY.value, 0))
+    alive = []
+    in_flight = []
+    for tick in range(ticks):
+        if tick < FIELD_HEIGHT - 1:
+            send_command(builder, (Opcode.PLACE, 10, tick))
+
+        # Spawns sent now land on the next tick, so the count can overshoot by
+        # at most one wave
+        missing = enemies - len(server.state.enemies)
+        if missing > 0:
+            count = min(255, missing)
+            send_command(spawner, (Opcode.SPAWN, EnemyType.HEAVY.value, count))
+
+        server_tick(server)
+        alive.append(len(server.state.enemies))
+        in_flight.append(len(server.state.projectiles.active))
+        await asyncio.sleep(tick_interval)
+
+    # Let clients drain their inbox before comparing
+    for _ in range(100):
+        if all(client.state.tick == server.state.tick for client in clients):
+            break
+        await asyncio.sleep(0.05)
+
+    for task in tasks:
+        task.cancel()
+    for client in clients:
+        client.writer.close()
+        await client.writer.wait_closed()
+    listener.close()
+    await listener.wait_closed()
+
+    checksum = state_checksum(server.state)
+    stats = server.stats
+    latencies = sorted(stats.latencies) or [0]
+
+    print(f"Ticks: {ticks}")
+    print(f"Enemies alive mean: {statistics.mean(alive):.0f}")
+    print(f"Projectiles in flight mean: {statistics.mean(in_flight):.0f}")
+    print(f"Server bytes out per tick: {stats.bytes_sent / ticks:.1f}")
+    print(f"Server bytes in per tick: {stats.bytes_received / ticks:.1f}")
+    print(f"Resyncs sent: {stats.resyncs}")
+    print(f"Desyncs detected: {stats.desyncs}")
+    print(f"Tick latency mean: {statistics.mean(latencies) * 1000:.2f} ms")
+    print(f"Tick latency p95: {latencies[int(len(latencies) * 0.95)] * 1000:.2f} ms")
+    for client in clients:
+        in_sync = client.state.tick == server.state.tick and (
+            state_checksum(client.state) == checksum
+        )
+        print(
+            f"Client {client.player_id}: tick {client.state.tick}, "
+            f"in sync {in_sync}, resyncs {client.stats.resyncs}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark lockstep over loopback")
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--enemies", type=int, default=5000)
+    parser.add_argument("--tick-interval", type=float, default=1 / 60)
+    parser.add_argument("--slow-client-delay", type=float, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(
+        benchmark(args.ticks, args.enemies, args.tick_interval, args.slow_client_delay)
+    )
+
+
+if __name__ == "__main__":
+    main()
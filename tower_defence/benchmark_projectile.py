@@ -0,0 +1,80 @@
+import argparse
+import random
+import time
+
+from aura import new_aura_grid
+from entity import EntityRegistry
+from field import FIELD_WIDTH, FIELD_HEIGHT, Direction, Tile, recalculate_flow_field
+from tower import TOWER_PROJECTILE_TABLE
+from enemy import EnemyList, EnemyType, spawn_enemy, update_enemies
+from player import Player
+from projectile import new_projectiles, spawn_projectile, update_projectiles
+
+
+def benchmark(projectile_count: int, enemy_count: int, ticks: int) -> None:
+    random.seed(0)
+    player = Player(0, 0)
+    aura_grid = new_aura_grid()
+    registry = EntityRegistry()
+    enemies: EnemyList = []
+    projectiles = new_projectiles(projectile_count)
+
+    start = (0, FIELD_HEIGHT // 2)
+    end = (FIELD_WIDTH - 1, FIELD_HEIGHT // 2)
+    field = [[Tile.EMPTY for x in range(FIELD_WIDTH)] for y in range(FIELD_HEIGHT)]
+    flow_field = [
+        [Direction.NONE for x in range(FIELD_WIDTH)] for y in range(FIELD_HEIGHT)
+    ]
+    recalculate_flow_field(field, flow_field, start, end)
+
+    for _ in range(enemy_count):
+        # Far enough from the end that nobody leaves during the benchmark
+        spawn = (random.randrange(FIELD_WIDTH - 5), start[1] + random.randint(-1, 1))
+        spawn_enemy(
+            spawn, random.choice(list(EnemyType)), enemies, registry, flow_field
+        )
+    for enemy in enemies:
+        enemy.health = float("inf")  # Keep every enemy alive
+
+    # Every tick refills the slots that landed, so the pool stays full
+    projectile_stats = list(TOWER_PROJECTILE_TABLE.values())
+    spawn_time = 0
+    update_time = 0
+    for _ in range(ticks):
+        timer = time.perf_counter()
+        while projectiles.free:
+            spawn_projectile(
+                projectiles,
+                random.randrange(FIELD_WIDTH),
+                random.randrange(FIELD_HEIGHT),
+                random.choice(enemies),
+                *random.choice(projectile_stats),
+                1,
+                aura_grid,
+            )
+        spawn_time += time.perf_counter() - timer
+
+        update_enemies(enemies, registry, player, flow_field, end, aura_grid)
+
+        timer = time.perf_counter()
+        update_projectiles(projectiles, enemies, registry, aura_grid)
+        update_time += time.perf_counter() - timer
+
+    print(f"Projectiles: {projectile_count}")
+    print(f"Enemies: {len(enemies)}")
+    print(f"Refill: {spawn_time / ticks * 1000:.2f} ms per tick")
+    print(f"update_projectiles: {update_time / ticks * 1000:.2f} ms per tick")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the projectile pool")
+    parser.add_argument("--projectiles", type=int, default=4096)
+    parser.add_argument("--enemies", type=int, default=2000)
+    parser.add_argument("--ticks", type=int, default=60)
+    args = parser.parse_args()
+
+    benchmark(args.projectiles, args.enemies, args.ticks)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from enum import Enum, auto
 
+from aura import AuraGrid, get_tile_index
+from entity import EntityRegistry, Handle, create_entity, destroy_entity
 from field import OPPOSITE_DIRECTION, Position, FlowField, Direction
 from player import Player
 
@@ -47,19 +49,28 @@ class Enemy:
     # Also for placing towers when enemy has left last square
     percent_travelled: float = 0
 
+    # Towers and projectiles refer to enemies only through this
+    handle: Handle = None
+
 
 # Typehints
 EnemyList = list[Enemy]
 
 
 def spawn_enemy(
-    spawn: Position, enemy_type: EnemyType, enemies: EnemyList, flow_field: FlowField
+    spawn: Position,
+    enemy_type: EnemyType,
+    enemies: EnemyList,
+    registry: EntityRegistry,
+    flow_field: FlowField,
 ) -> None:
     stats = ENEMY_STATS_TABLE[enemy_type]
     direction = flow_field[spawn[1]][spawn[0]]
     next_tile = (spawn[0] + direction.value[0], spawn[1] + direction.value[1])
 
-    enemies.append(Enemy(enemy_type, *stats, *spawn, *next_tile, *spawn, direction))
+    enemy = Enemy(enemy_type, *stats, *spawn, *next_tile, *spawn, direction)
+    enemy.handle = create_entity(registry, enemy)
+    enemies.append(enemy)
 
 
 def handle_enemies_backtracking(enemies: EnemyList, flow_field: FlowField) -> None:
@@ -80,23 +91,36 @@ def handle_enemies_backtracking(enemies: EnemyList, flow_field: FlowField) -> No
 
 
 def update_enemies(
-    enemies: EnemyList, player: Player, flow_field: FlowField, end: Position
+    enemies: EnemyList,
+    registry: EntityRegistry,
+    player: Player,
+    flow_field: FlowField,
+    end: Position,
+    aura_grid: AuraGrid,
 ) -> None:
     # Update enemies (Loop through backwards so I can remove them if dead)
     for i in range(len(enemies) - 1, -1, -1):
         enemy = enemies[i]
 
+        # Auras covering the enemy's tile (Before the death check so an enemy
+        # killed by an aura is removed this tick)
+        tile = get_tile_index(enemy.x, enemy.y)
+        enemy.health -= aura_grid.damage[tile]
+
         # Check if enemy is dead
         if enemy.health <= 0:
             # Add value to player money
             player.money += enemy.value
+            destroy_entity(registry, enemy.handle)
             enemies.pop(i)
             continue
 
+        speed = enemy.speed * aura_grid.speed_multiplier[tile]
+
         # Move
-        enemy.x += enemy.move_direction.value[0] * enemy.speed
-        enemy.y += enemy.move_direction.value[1] * enemy.speed
-        enemy.percent_travelled += enemy.speed
+        enemy.x += enemy.move_direction.value[0] * speed
+        enemy.y += enemy.move_direction.value[1] * speed
+        enemy.percent_travelled += speed
 
         # Check if enemy has made it to the next_tile
         if enemy.percent_travelled >= 1:
@@ -109,6 +133,7 @@ def update_enemies(
                 # Deal damage to player health
                 player.health -= enemy.damage
                 enemy.health = 0
+                destroy_entity(registry, enemy.handle)
                 enemies.pop(i)
                 continue
 
@@ -0,0 +1,49 @@
+from dataclasses import dataclass, field as dataclass_field
+from typing import Any
+
+
+# Typehints
+# Tuple format: (INDEX, GENERATION)
+# Generation is bumped every time a slot is freed so old handles go stale
+Handle = tuple[int, int]
+
+
+@dataclass
+class EntityRegistry:
+    entities: list[Any] = dataclass_field(default_factory=list)
+    generations: list[int] = dataclass_field(default_factory=list)
+    free: list[int] = dataclass_field(default_factory=list)
+
+
+def create_entity(registry: EntityRegistry, entity: Any) -> Handle:
+    if registry.free:
+        i = registry.free.pop()
+        registry.entities[i] = entity
+    else:
+        i = len(registry.entities)
+        registry.entities.append(entity)
+        registry.generations.append(0)
+
+    return (i, registry.generations[i])
+
+
+def destroy_entity(registry: EntityRegistry, handle: Handle) -> None:
+    i, generation = handle
+    if registry.generations[i] != generation:
+        return  # Already destroyed
+
+    registry.entities[i] = None
+    registry.generations[i] += 1
+    registry.free.append(i)
+
+
+def get_entity(registry: EntityRegistry, handle: Handle) -> Any:
+    # Returns None if the entity behind handle has been destroyed
+    if handle is None:
+        return None
+
+    i, generation = handle
+    if registry.generations[i] != generation:
+        return None
+
+    return registry.entities[i]
@@ -0,0 +1,901 @@
+import argparse
+import asyncio
+import struct
+import time
+import zlib
+from array import array
+from dataclasses import dataclass, field as dataclass_field
+from enum import IntEnum, auto
+
+from aura import AuraGrid, new_aura_grid, stamp_aura
+from entity import EntityRegistry
+from field import (
+    FIELD_WIDTH,
+    FIELD_HEIGHT,
+    Position,
+    Field,
+    FlowField,
+    Direction,
+    Tile,
+    recalculate_flow_field,
+)
+from tower import (
+    TOWER_AURA_TABLE,
+    TOWER_STATS_TABLE,
+    Tower,
+    TowerMap,
+    TowerType,
+    valid_tower_tile,
+    is_tower_on_enemy,
+    place_tower,
+    update_towers,
+)
+from enemy import (
+    ENEMY_STATS_TABLE,
+    Enemy,
+    EnemyList,
+    EnemyType,
+    handle_enemies_backtracking,
+    spawn_enemy,
+    update_enemies,
+)
+from player import Player, STARTING_HEALTH, STARTING_MONEY
+from projectile import Projectiles, new_projectiles, update_projectiles
+
+# Clients send a checksum every this many ticks
+CHECKSUM_INTERVAL = 10
+# Server keeps this many ticks of its own checksums to compare against
+CHECKSUM_HISTORY = 64
+# Client is resynced when its last reported tick is this far behind
+MAX_LAG_TICKS = 30
+# Player ids and the number of selections are packed in one byte
+MAX_PLAYERS = 255
+
+
+class MessageKind(IntEnum):
+    WELCOME = auto()  # server -> client: player id
+    COMMAND = auto()  # client -> server: one command
+    TICK = auto()  # server -> client: tick and every command applied on it
+    CHECKSUM = auto()  # client -> server: tick and crc of packed state
+    RESYNC = auto()  # server -> client: full state, delta compressed if smaller
+
+
+class ResyncMode(IntEnum):
+    FULL = auto()  # zlib of the packed state
+    DELTA = auto()  # zlib of per record changes against the last resync
+
+
+# Every command is packed as (OPCODE, A, B)
+class Opcode(IntEnum):
+    PLACE = auto()  # (x, y)
+    SELECT = auto()  # (tower_type.value, unused)
+    SPAWN = auto()  # (enemy_type.value, count)
+
+
+HEADER_FORMAT = struct.Struct("<BI")  # (KIND, LENGTH)
+COMMAND_FORMAT = struct.Struct("<BBB")
+PLAYER_COMMAND_FORMAT = struct.Struct("<BBBB")  # (PLAYER_ID, OPCODE, A, B)
+TICK_FORMAT = struct.Struct("<IH")  # (TICK, COMMAND_COUNT)
+CHECKSUM_FORMAT = struct.Struct("<II")  # (TICK, CRC)
+RESYNC_FORMAT = struct.Struct("<IB")  # (TICK, MODE)
+
+# Longest payload each side accepts, a longer one drops the connection
+MAX_CLIENT_MESSAGE_LENGTH = max(COMMAND_FORMAT.size, CHECKSUM_FORMAT.size)
+MAX_SERVER_MESSAGE_LENGTH = 64 * 1024 * 1024
+
+# Packed state layout
+# (TICK, HEALTH, MONEY, PLAYERS, ENTITY_SLOTS, FREE_ENTITY_SLOTS, TOWERS, ENEMIES,
+#  PROJECTILES, FREE_PROJECTILE_SLOTS)
+STATE_FORMAT = struct.Struct("<IiiBIIHIHH")
+SELECTION_FORMAT = struct.Struct("<BB")  # (PLAYER_ID, TOWER_TYPE)
+# (X, Y, TYPE, RELOAD_TIMER, TARGET_INDEX, TARGET_GENERATION)
+TOWER_FORMAT = struct.Struct("<BBBdiI")
+# (INDEX, GENERATION, TYPE, HEALTH, LAST_X, LAST_Y, NEXT_X, NEXT_Y, X, Y,
+#  PERCENT_TRAVELLED, DIRECTION)
+ENEMY_FORMAT = struct.Struct("<IIBdbbbbdddB")
+# (SLOT, X, Y, VELOCITY_X, VELOCITY_Y, AIM_X, AIM_Y, TICKS_LEFT, DAMAGE, SPLASH_RADIUS,
+#  TARGET_INDEX, TARGET_GENERATION)
+PROJECTILE_FORMAT = struct.Struct("<Hddddddiddii")
+
+DIRECTIONS: tuple[Direction] = tuple(Direction)
+
+
+# Typehints
+Command = tuple[int, int, int]
+PlayerCommand = tuple[int, int, int, int]
+
+
+@dataclass
+class GameState:
+    player: Player
+    tower_map: TowerMap
+    enemies: EnemyList
+    registry: EntityRegistry
+    projectiles: Projectiles
+    aura_grid: AuraGrid
+    field: Field
+    flow_field: FlowField
+    preview_flow_field: FlowField
+    start: Position
+    end: Position
+    selected_tower_types: dict[int, TowerType]
+    tick: int = 0
+
+
+def new_game_state() -> GameState:
+    state = GameState(
+        Player(STARTING_HEALTH, STARTING_MONEY),
+        {},
+        [],
+        EntityRegistry(),
+        new_projectiles(),
+        new_aura_grid(),
+        [[Tile.EMPTY for x in range(FIELD_WIDTH)] for y in range(FIELD_HEIGHT)],
+        [[Direction.NONE for x in range(FIELD_WIDTH)] for y in range(FIELD_HEIGHT)],
+        [[Direction.NONE for x in range(FIELD_WIDTH)] for y in range(FIELD_HEIGHT)],
+        (0, FIELD_HEIGHT // 2),
+        (FIELD_WIDTH - 1, FIELD_HEIGHT // 2),
+        {},
+    )
+    recalculate_flow_field(state.field, state.flow_field, state.start, state.end)
+    return state
+
+
+TOWER_TYPE_VALUES = {tower_type.value for tower_type in TowerType}
+ENEMY_TYPE_VALUES = {enemy_type.value for enemy_type in EnemyType}
+
+
+def valid_command(command: Command) -> bool:
+    # Checked on the server before a command is scheduled, apply_command
+    # trusts everything that reaches it
+    opcode, a, b = command
+    match (opcode):
+        case Opcode.PLACE:
+            return True  # Out of field tiles are rejected by valid_tower_tile
+        case Opcode.SELECT:
+            return a in TOWER_TYPE_VALUES
+        case Opcode.SPAWN:
+            return a in ENEMY_TYPE_VALUES
+        case _:
+            return False
+
+
+def apply_command(state: GameState, player_id: int, command: Command) -> None:
+    # Same rules as the local game loop in main.py
+    opcode, a, b = command
+    match (opcode):
+        case Opcode.PLACE:
+            if not valid_tower_tile(
+                a, b, state.field, state.preview_flow_field, state.start, state.end
+            ):
+                return
+            if not is_tower_on_enemy(
+                a, b, state.field, state.preview_flow_field, state.enemies
+            ):
+                return
+
+            tower_type = state.selected_tower_types.get(player_id, TowerType.BASIC)
+            place_tower(
+                a,
+                b,
+                tower_type,
+                state.field,
+                state.tower_map,
+                state.player,
+                state.aura_grid,
+            )
+            recalculate_flow_field(
+                state.field, state.flow_field, state.start, state.end
+            )
+            handle_enemies_backtracking(state.enemies, state.flow_field)
+        case Opcode.SELECT:
+            state.selected_tower_types[player_id] = TowerType(a)
+        case Opcode.SPAWN:
+            for _ in range(b):
+                spawn_enemy(
+                    state.start,
+                    EnemyType(a),
+                    state.enemies,
+                    state.registry,
+                    state.flow_field,
+                )
+
+
+def advance(state: GameState, commands: list[PlayerCommand]) -> None:
+    for player_id, *command in commands:
+        apply_command(state, player_id, command)
+
+    update_enemies(
+        state.enemies,
+        state.registry,
+        state.player,
+        state.flow_field,
+        state.end,
+        state.aura_grid,
+    )
+    update_towers(
+        state.tower_map,
+        state.enemies,
+        state.registry,
+        state.projectiles,
+        state.aura_grid,
+    )
+    update_projectiles(
+        state.projectiles, state.enemies, state.registry, state.aura_grid
+    )
+    state.tick += 1
+
+
+def pack_state(state: GameState) -> bytes:
+    # Enemies are referred to by handle so the registry slots and generations
+    # have to survive the round trip as well
+    chunks = [
+        STATE_FORMAT.pack(
+            state.tick,
+            state.player.health,
+            state.player.money,
+            len(state.selected_tower_types),
+            len(state.registry.generations),
+            len(state.registry.free),
+            len(state.tower_map),
+            len(state.enemies),
+            len(state.projectiles.active),
+            len(state.projectiles.free),
+        )
+    ]
+    for player_id, tower_type in sorted(state.selected_tower_types.items()):
+        chunks.append(SELECTION_FORMAT.pack(player_id, tower_type.value))
+    chunks.append(array("I", state.registry.generations).tobytes())
+    chunks.append(array("I", state.registry.free).tobytes())
+    for (x, y), tower in state.tower_map.items():
+        target = (-1, 0) if tower.target is None else tower.target
+        chunks.append(
+            TOWER_FORMAT.pack(x, y, tower.tower_type.value, tower.reload_timer, *target)
+        )
+    for enemy in state.enemies:
+        chunks.append(
+            ENEMY_FORMAT.pack(
+                *enemy.handle,
+                enemy.enemy_type.value,
+                enemy.health,
+                enemy.last_x,
+                enemy.last_y,
+                enemy.next_x,
+                enemy.next_y,
+                enemy.x,
+                enemy.y,
+                enemy.percent_travelled,
+                DIRECTIONS.index(enemy.move_direction),
+            )
+        )
+
+    projectiles = state.projectiles
+    for i in projectiles.active:
+        chunks.append(
+            PROJECTILE_FORMAT.pack(
+                i,
+                projectiles.x[i],
+                projectiles.y[i],
+                projectiles.velocity_x[i],
+                projectiles.velocity_y[i],
+                projectiles.aim_x[i],
+                projectiles.aim_y[i],
+                projectiles.ticks_left[i],
+                projectiles.damage[i],
+                projectiles.splash_radius[i],
+                projectiles.target_index[i],
+                projectiles.target_generation[i],
+            )
+        )
+    # Free list order decides which slot the next projectile gets
+    chunks.append(array("H", projectiles.free).tobytes())
+
+    return b"".join(chunks)
+
+
+def unpack_state(data: bytes) -> GameState:
+    state = new_game_state()
+    (
+        tick,
+        health,
+        money,
+        players,
+        entity_slots,
+        free_entity_slots,
+        towers,
+        enemies,
+        projectiles,
+        free_slots,
+    ) = STATE_FORMAT.unpack_from(data)
+    offset = STATE_FORMAT.size
+
+    state.tick = tick
+    state.player.health = health
+    state.player.money = money
+
+    for _ in range(players):
+        player_id, tower_type = SELECTION_FORMAT.unpack_from(data, offset)
+        state.selected_tower_types[player_id] = TowerType(tower_type)
+        offset += SELECTION_FORMAT.size
+
+    generations = array("I")
+    generations.frombytes(data[offset : offset + entity_slots * generations.itemsize])
+    offset += entity_slots * generations.itemsize
+    free = array("I")
+    free.frombytes(data[offset : offset + free_entity_slots * free.itemsize])
+    offset += free_entity_slots * free.itemsize
+    state.registry.generations = generations.tolist()
+    state.registry.free = free.tolist()
+    state.registry.entities = [None] * entity_slots
+
+    for _ in range(towers):
+        x, y, tower_type, reload_timer, *target = TOWER_FORMAT.unpack_from(data, offset)
+        tower_type = TowerType(tower_type)
+        tower = Tower(tower_type, *TOWER_STATS_TABLE[tower_type])
+        tower.reload_timer = reload_timer
+        tower.target = None if target[0] < 0 else tuple(target)
+        state.tower_map[(x, y)] = tower
+        state.field[y][x] = Tile.TOWER
+        offset += TOWER_FORMAT.size
+
+        # Aura grid is rebuilt in placement order so the sums match exactly
+        if tower_type in TOWER_AURA_TABLE:
+            stamp_aura(
+                state.aura_grid, x, y, tower.range, *TOWER_AURA_TABLE[tower_type]
+            )
+
+    for _ in range(enemies):
+        (
+            index,
+            generation,
+            enemy_type,
+            health,
+            *tiles,
+            x,
+            y,
+            percent,
+            direction,
+        ) = ENEMY_FORMAT.unpack_from(data, offset)
+        enemy_type = EnemyType(enemy_type)
+        _, speed, damage, value = ENEMY_STATS_TABLE[enemy_type]
+        enemy = Enemy(
+            enemy_type,
+            health,
+            speed,
+            damage,
+            value,
+            *tiles,
+            x,
+            y,
+            DIRECTIONS[direction],
+            percent,
+            (index, generation),
+        )
+        state.enemies.append(enemy)
+        state.registry.entities[index] = enemy
+        offset += ENEMY_FORMAT.size
+
+    state.projectiles.active = []
+    for _ in range(projectiles):
+        i, *values = PROJECTILE_FORMAT.unpack_from(data, offset)
+        (
+            state.projectiles.x[i],
+            state.projectiles.y[i],
+            state.projectiles.velocity_x[i],
+            state.projectiles.velocity_y[i],
+            state.projectiles.aim_x[i],
+            state.projectiles.aim_y[i],
+            state.projectiles.ticks_left[i],
+            state.projectiles.damage[i],
+            state.projectiles.splash_radius[i],
+            state.projectiles.target_index[i],
+            state.projectiles.target_generation[i],
+        ) = values
+        state.projectiles.active.append(i)
+        offset += PROJECTILE_FORMAT.size
+
+    free = array("H")
+    free.frombytes(data[offset : offset + free_slots * free.itemsize])
+    state.projectiles.free = free.tolist()
+
+    recalculate_flow_field(state.field, state.flow_field, state.start, state.end)
+    return state
+
+
+def state_checksum(state: GameState) -> int:
+    return zlib.crc32(pack_state(state))
+
+
+def get_field_slices(record_format: struct.Struct) -> list[slice]:
+    # Byte range of every field in a little endian record format
+    slices = []
+    offset = 0
+    for code in record_format.format[1:]:
+        size = struct.calcsize("<" + code)
+        slices.append(slice(offset, offset + size))
+        offset += size
+    return slices
+
+
+# Records are delta encoded one by one, keyed by their leading field
+# Tuple format: (RECORD_FORMAT, KEY_SIZE, FIELD_SLICES)
+RECORD_SECTIONS: tuple[tuple] = (
+    (TOWER_FORMAT, 2, get_field_slices(TOWER_FORMAT)),  # Keyed by (X, Y)
+    (ENEMY_FORMAT, 4, get_field_slices(ENEMY_FORMAT)),  # Keyed by handle index
+    (PROJECTILE_FORMAT, 2, get_field_slices(PROJECTILE_FORMAT)),  # Keyed by slot
+)
+# (RECORDS, REMOVED, ADDED, EXPLICIT_ORDER)
+SECTION_FORMAT = struct.Struct("<IIIB")
+BLOB_LENGTHS_FORMAT = struct.Struct("<II")  # (GLOBAL_LENGTH, TAIL_LENGTH)
+
+
+def split_state(data: bytes) -> tuple[bytes, list[list[bytes]], bytes]:
+    # Splits packed state into the global part (header, selections, registry),
+    # the tower, enemy and projectile records, and the projectile free list
+    header = STATE_FORMAT.unpack_from(data)
+    players, entity_slots, free_entity_slots, towers, enemies, projectiles = header[3:9]
+    offset = STATE_FORMAT.size + players * SELECTION_FORMAT.size
+    offset += (entity_slots + free_entity_slots) * 4
+    global_data = data[:offset]
+
+    sections = []
+    for (record_format, _, _), count in zip(
+        RECORD_SECTIONS, (towers, enemies, projectiles)
+    ):
+        size = record_format.size
+        sections.append(
+            [data[offset + i * size : offset + (i + 1) * size] for i in range(count)]
+        )
+        offset += count * size
+
+    return global_data, sections, data[offset:]
+
+
+def xor_bytes(baseline: bytes, data: bytes) -> bytes:
+    # Unchanged bytes become zero runs, and so do the high bytes of floats
+    # that only moved a little
+    padded = baseline[: len(data)].ljust(len(data), b"\0")
+    return (int.from_bytes(data, "little") ^ int.from_bytes(padded, "little")).to_bytes(
+        len(data), "little"
+    )
+
+
+def encode_section(
+    baseline_records: list[bytes],
+    records: list[bytes],
+    key_size: int,
+    field_slices: list[slice],
+) -> bytes:
+    baseline = {record[:key_size]: record for record in baseline_records}
+    keys = [record[:key_size] for record in records]
+    current = dict(zip(keys, records))
+
+    removed = [key for key in baseline if key not in current]
+    added = [record for record in records if record[:key_size] not in baseline]
+
+    # One mask per surviving record in baseline order, a set bit means the
+    # field changed. Changed fields are XORed against the baseline and stored
+    # field by field, so records changing the same way compress together
+    masks = []
+    columns = [[] for _ in field_slices]
+    for key, old_record in baseline.items():
+        record = current.get(key)
+        if record is None:
+            continue
+
+        mask = 0
+        if record != old_record:
+            for bit, field_slice in enumerate(field_slices):
+                if record[field_slice] != old_record[field_slice]:
+                    mask |= 1 << bit
+                    columns[bit].append(
+                        xor_bytes(old_record[field_slice], record[field_slice])
+                    )
+        masks.append(mask)
+
+    # Lists only ever append new records and drop old ones, so the order is
+    # implied unless something reordered them
+    implied_order = [key for key in baseline if key in current]
+    implied_order += [record[:key_size] for record in added]
+    explicit_order = implied_order != keys
+
+    chunks = [
+        SECTION_FORMAT.pack(len(records), len(removed), len(added), explicit_order)
+    ]
+    chunks += removed
+    chunks += added
+    chunks.append(array("H", masks).tobytes())
+    for column in columns:
+        chunks += column
+    if explicit_order:
+        chunks += keys
+
+    return b"".join(chunks)
+
+
+def decode_section(
+    baseline_records: list[bytes],
+    data: bytes,
+    offset: int,
+    record_format: struct.Struct,
+    key_size: int,
+    field_slices: list[slice],
+) -> tuple[list[bytes], int]:
+    count, removed, added, explicit_order = SECTION_FORMAT.unpack_from(data, offset)
+    offset += SECTION_FORMAT.size
+
+    records = {record[:key_size]: record for record in baseline_records}
+    for _ in range(removed):
+        del records[data[offset : offset + key_size]]
+        offset += key_size
+    survivors = list(records)
+
+    order = survivors.copy()
+    for _ in range(added):
+        record = data[offset : offset + record_format.size]
+        records[record[:key_size]] = record
+        order.append(record[:key_size])
+        offset += record_format.size
+
+    masks = array("H", data[offset : offset + len(survivors) * 2])
+    offset += len(survivors) * 2
+
+    changed = {
+        key: bytearray(records[key]) for key, mask in zip(survivors, masks) if mask
+    }
+    for bit, field_slice in enumerate(field_slices):
+        size = field_slice.stop - field_slice.start
+        for key, mask in zip(survivors, masks):
+            if mask & (1 << bit):
+                record = changed[key]
+                record[field_slice] = xor_bytes(
+                    record[field_slice], data[offset : offset + size]
+                )
+                offset += size
+    for key, record in changed.items():
+        records[key] = bytes(record)
+
+    if explicit_order:
+        order = [
+            data[offset + i * key_size : offset + (i + 1) * key_size]
+            for i in range(count)
+        ]
+        offset += count * key_size
+
+    return [records[key] for key in order], offset
+
+
+def delta_encode(baseline: bytes, data: bytes) -> bytes:
+    # Delta against the last state the receiver has, record by record
+    baseline_global, baseline_sections, baseline_tail = split_state(baseline)
+    global_data, sections, tail = split_state(data)
+
+    chunks = [
+        BLOB_LENGTHS_FORMAT.pack(len(global_data), len(tail)),
+        xor_bytes(baseline_global, global_data),
+        xor_bytes(baseline_tail, tail),
+    ]
+    for (_, key_size, field_slices), baseline_records, records in zip(
+        RECORD_SECTIONS, baseline_sections, sections
+    ):
+        chunks.append(encode_section(baseline_records, records, key_size, field_slices))
+
+    return zlib.compress(b"".join(chunks))
+
+
+def delta_decode(baseline: bytes, payload: bytes) -> bytes:
+    delta = zlib.decompress(payload)
+    baseline_global, baseline_sections, baseline_tail = split_state(baseline)
+
+    global_length, tail_length = BLOB_LENGTHS_FORMAT.unpack_from(delta)
+    offset = BLOB_LENGTHS_FORMAT.size
+    chunks = [xor_bytes(baseline_global, delta[offset : offset + global_length])]
+    offset += global_length
+    tail = xor_bytes(baseline_tail, delta[offset : offset + tail_length])
+    offset += tail_length
+
+    for (record_format, key_size, field_slices), baseline_records in zip(
+        RECORD_SECTIONS, baseline_sections
+    ):
+        records, offset = decode_section(
+            baseline_records, delta, offset, record_format, key_size, field_slices
+        )
+        chunks += records
+
+    chunks.append(tail)
+    return b"".join(chunks)
+
+
+def encode_resync(baseline: bytes, data: bytes) -> tuple[int, bytes]:
+    # Falls back to plain zlib when there is no baseline or the delta is bigger
+    full = zlib.compress(data)
+    if not baseline:
+        return ResyncMode.FULL, full
+
+    delta = delta_encode(baseline, data)
+    if len(delta) < len(full):
+        return ResyncMode.DELTA, delta
+    return ResyncMode.FULL, full
+
+
+def decode_resync(baseline: bytes, mode: int, payload: bytes) -> bytes:
+    if mode == ResyncMode.DELTA:
+        return delta_decode(baseline, payload)
+    return zlib.decompress(payload)
+
+
+@dataclass
+class Stats:
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    resyncs: int = 0
+    desyncs: int = 0
+    latencies: list[float] = dataclass_field(default_factory=list)
+
+
+def send_message(
+    writer: asyncio.StreamWriter, kind: int, payload: bytes, stats: Stats
+) -> None:
+    message = HEADER_FORMAT.pack(kind, len(payload)) + payload
+    writer.write(message)
+    stats.bytes_sent += len(message)
+
+
+async def read_message(
+    reader: asyncio.StreamReader, stats: Stats, max_length: int
+) -> tuple[int, bytes]:
+    kind, length = HEADER_FORMAT.unpack(await reader.readexactly(HEADER_FORMAT.size))
+    if length > max_length:
+        raise ConnectionError(f"Message of {length} bytes is too long")
+
+    payload = await reader.readexactly(length)
+    stats.bytes_received += HEADER_FORMAT.size + length
+    return kind, payload
+
+
+### SERVER ###
+@dataclass
+class Connection:
+    player_id: int
+    writer: asyncio.StreamWriter
+    # Last state sent in a resync, both sides delta against it
+    baseline: bytes = b""
+    last_tick: int = 0
+
+
+@dataclass
+class Server:
+    state: GameState
+    connections: dict[int, Connection] = dataclass_field(default_factory=dict)
+    pending: list[PlayerCommand] = dataclass_field(default_factory=list)
+    checksums: dict[int, int] = dataclass_field(default_factory=dict)
+    tick_times: dict[int, float] = dataclass_field(default_factory=dict)
+    stats: Stats = dataclass_field(default_factory=Stats)
+
+
+def send_resync(server: Server, connection: Connection) -> None:
+    data = pack_state(server.state)
+    mode, payload = encode_resync(connection.baseline, data)
+    send_message(
+        connection.writer,
+        MessageKind.RESYNC,
+        RESYNC_FORMAT.pack(server.state.tick, mode) + payload,
+        server.stats,
+    )
+    connection.baseline = data
+    connection.last_tick = server.state.tick
+    server.stats.resyncs += 1
+
+
+async def handle_connection(
+    server: Server, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    # Ids of players that left are handed out again
+    player_id = next(
+        (i for i in range(MAX_PLAYERS) if i not in server.connections), None
+    )
+    if player_id is None:
+        writer.close()  # Server is full
+        return
+
+    try:
+        connection = Connection(player_id, writer)
+        server.connections[player_id] = connection
+
+        send_message(writer, MessageKind.WELCOME, bytes((player_id,)), server.stats)
+        send_resync(server, connection)
+
+        while True:
+            kind, payload = await read_message(
+                reader, server.stats, MAX_CLIENT_MESSAGE_LENGTH
+            )
+            match (kind):
+                case MessageKind.COMMAND:
+                    # Drop malformed commands so they never reach server_tick
+                    try:
+                        command = COMMAND_FORMAT.unpack(payload)
+                    except struct.error:
+                        continue
+                    if valid_command(command):
+                        server.pending.append((player_id, *command))
+                case MessageKind.CHECKSUM:
+                    try:
+                        tick, crc = CHECKSUM_FORMAT.unpack(payload)
+                    except struct.error:
+                        continue
+                    connection.last_tick = max(connection.last_tick, tick)
+
+                    if tick in server.tick_times:
+                        server.stats.latencies.append(
+                            time.perf_counter() - server.tick_times[tick]
+                        )
+                    if tick in server.checksums and server.checksums[tick] != crc:
+                        server.stats.desyncs += 1
+                        send_resync(server, connection)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        server.connections.pop(player_id, None)
+        writer.close()
+
+
+def server_tick(server: Server) -> None:
+    commands = server.pending
+    server.pending = []
+    advance(server.state, commands)
+    tick = server.state.tick
+
+    payload = [TICK_FORMAT.pack(tick, len(commands))]
+    payload += [PLAYER_COMMAND_FORMAT.pack(*command) for command in commands]
+    payload = b"".join(payload)
+
+    server.tick_times[tick] = time.perf_counter()
+    server.tick_times.pop(tick - CHECKSUM_HISTORY, None)
+    if tick % CHECKSUM_INTERVAL == 0:
+        server.checksums[tick] = state_checksum(server.state)
+        server.checksums.pop(tick - CHECKSUM_HISTORY, None)
+
+    for connection in list(server.connections.values()):
+        send_message(connection.writer, MessageKind.TICK, payload, server.stats)
+        if tick - connection.last_tick > MAX_LAG_TICKS:
+            send_resync(server, connection)
+
+
+async def run_server(server: Server, tick_interval: float) -> None:
+    while True:
+        server_tick(server)
+        await asyncio.sleep(tick_interval)
+
+
+### CLIENT ###
+@dataclass
+class Client:
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    player_id: int = -1
+    state: GameState = None
+    baseline: bytes = b""
+    # Artificial per tick delay to simulate a client that falls behind
+    tick_delay: float = 0
+    inbox: list[tuple[int, bytes]] = dataclass_field(default_factory=list)
+    inbox_event: asyncio.Event = dataclass_field(default_factory=asyncio.Event)
+    stats: Stats = dataclass_field(default_factory=Stats)
+
+
+async def connect(host: str, port: int, tick_delay: float = 0) -> Client:
+    reader, writer = await asyncio.open_connection(host, port)
+    client = Client(reader, writer, tick_delay=tick_delay)
+    kind, payload = await read_message(reader, client.stats, MAX_SERVER_MESSAGE_LENGTH)
+    client.player_id = payload[0]
+    return client
+
+
+def send_command(client: Client, command: Command) -> None:
+    send_message(
+        client.writer, MessageKind.COMMAND, COMMAND_FORMAT.pack(*command), client.stats
+    )
+
+
+def apply_resync(client: Client, payload: bytes, unpack: bool = True) -> None:
+    # Every resync has to be decoded to keep the baseline in step with the
+    # server, but only the newest one needs unpacking
+    tick, mode = RESYNC_FORMAT.unpack_from(payload)
+    client.baseline = decode_resync(
+        client.baseline, mode, payload[RESYNC_FORMAT.size :]
+    )
+    if unpack:
+        client.state = unpack_state(client.baseline)
+    client.stats.resyncs += 1
+
+
+def apply_tick(client: Client, payload: bytes) -> None:
+    tick, count = TICK_FORMAT.unpack_from(payload)
+
+    # Already covered by a resync
+    if client.state is None or tick <= client.state.tick:
+        return
+
+    commands = [
+        PLAYER_COMMAND_FORMAT.unpack_from(
+            payload, TICK_FORMAT.size + i * PLAYER_COMMAND_FORMAT.size
+        )
+        for i in range(count)
+    ]
+    advance(client.state, commands)
+
+    if tick % CHECKSUM_INTERVAL == 0:
+        send_message(
+            client.writer,
+            MessageKind.CHECKSUM,
+            CHECKSUM_FORMAT.pack(tick, state_checksum(client.state)),
+            client.stats,
+        )
+
+
+async def receive_messages(client: Client) -> None:
+    try:
+        while True:
+            client.inbox.append(
+                await read_message(
+                    client.reader, client.stats, MAX_SERVER_MESSAGE_LENGTH
+                )
+            )
+            client.inbox_event.set()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+
+
+async def run_client(client: Client) -> None:
+    receiver = asyncio.create_task(receive_messages(client))
+    try:
+        while True:
+            await client.inbox_event.wait()
+            client.inbox_event.clear()
+
+            while client.inbox:
+                # Skip straight to the newest resync if one is waiting
+                resyncs = [
+                    i
+                    for i, (kind, _) in enumerate(client.inbox)
+                    if kind == MessageKind.RESYNC
+                ]
+                if resyncs:
+                    for i in resyncs:
+                        apply_resync(client, client.inbox[i][1], i == resyncs[-1])
+                    del client.inbox[: resyncs[-1] + 1]
+
+                if not client.inbox:
+                    break
+
+                kind, payload = client.inbox.pop(0)
+                if kind == MessageKind.TICK:
+                    apply_tick(client, payload)
+                    if client.tick_delay > 0:
+                        await asyncio.sleep(client.tick_delay)
+                    else:
+                        await asyncio.sleep(0)
+    finally:
+        receiver.cancel()
+
+
+async def serve(host: str, port: int, tick_interval: float) -> None:
+    server = Server(new_game_state())
+    listener = await asyncio.start_server(
+        lambda reader, writer: handle_connection(server, reader, writer), host, port
+    )
+    async with listener:
+        await run_server(server, tick_interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a lockstep server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--tick-interval", type=float, default=1 / 60)
+    args = parser.parse_args()
+
+    asyncio.run(serve(args.host, args.port, args.tick_interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import argparse
+import asyncio
 import pygame
 import random
 
@@ -6,7 +8,7 @@ from constants import (
     FPS,
     COLOR_KEY,
 )
-from render import FIELD_OFFSET_X, FIELD_OFFSET_Y, BLACK
+from render import FIELD_OFFSET_X, FIELD_OFFSET_Y, BLACK, OverlayCache, PathOverlay
 from field import (
     FIELD_WIDTH,
     FIELD_HEIGHT,
@@ -27,6 +29,7 @@ from tower import (
     place_tower,
     update_towers,
 )
+from entity import EntityRegistry
 from enemy import (
     EnemyList,
     EnemyType,
@@ -35,6 +38,9 @@ from enemy import (
     update_enemies,
 )
 from player import Player, STARTING_HEALTH, STARTING_MONEY
+from aura import AuraGrid, new_aura_grid
+from projectile import Projectiles, new_projectiles, update_projectiles
+from lockstep import Opcode, connect, run_client, send_command
 from render import (
     render_enemies,
     render_field,
@@ -43,8 +49,8 @@ from render import (
     render_preview,
     render_shortest_path,
     render_towers,
+    render_projectiles,
     render_tower_range,
-    render_tower_targets,
 )
 
 
@@ -61,11 +67,23 @@ transparent_surface.set_colorkey(COLOR_KEY)
 font = pygame.font.SysFont("sfprodisplayblack", 10)
 font_big = pygame.font.SysFont("sfprodisplayblack", 30)
 
+TOWER_TYPE_KEYS = {
+    "1": TowerType.BASIC,
+    "2": TowerType.HEAVY,
+    "3": TowerType.SPEEDY,
+    "4": TowerType.SLOW,
+    "5": TowerType.POISON,
+    "6": TowerType.BUFF,
+}
+
 
 def main() -> None:
     player: Player = Player(STARTING_HEALTH, STARTING_MONEY)
     tower_map: TowerMap = {}
     enemies: EnemyList = []
+    registry: EntityRegistry = EntityRegistry()
+    projectiles: Projectiles = new_projectiles()
+    aura_grid: AuraGrid = new_aura_grid()
 
     start: Position = (0, FIELD_HEIGHT // 2)
     end: Position = (FIELD_WIDTH - 1, FIELD_HEIGHT // 2)
@@ -79,6 +97,14 @@ def main() -> None:
         [Direction.NONE for x in range(FIELD_WIDTH)] for y in range(FIELD_HEIGHT)
     ]
 
+    # Overlays are only rebuilt when the version of their flow field changes
+    overlay_cache = OverlayCache()
+    flow_field_version = 0
+    preview_flow_field_version = 0
+
+    # Whether enemies were drawn as a heatmap last frame
+    enemy_lod = False
+
     last_preview_x = -1
     last_preview_y = -1
     valid_tile = False
@@ -102,14 +128,8 @@ def main() -> None:
                     terminate()
                 if event.key == pygame.K_SPACE:
                     spawn_new_enemy = True
-                if event.unicode.isdigit():
-                    match (event.unicode):
-                        case "1":
-                            selected_tower_type = TowerType.BASIC
-                        case "2":
-                            selected_tower_type = TowerType.HEAVY
-                        case "3":
-                            selected_tower_type = TowerType.SPEEDY
+                if event.unicode in TOWER_TYPE_KEYS:
+                    selected_tower_type = TOWER_TYPE_KEYS[event.unicode]
 
             if event.type == pygame.MOUSEBUTTONUP:
                 mouse_clicked = True
@@ -125,6 +145,7 @@ def main() -> None:
             valid_tile = valid_tower_tile(
                 preview_x, preview_y, field, preview_flow_field, start, end
             )
+            preview_flow_field_version += 1
             last_preview_x = preview_x
             last_preview_y = preview_y
 
@@ -137,9 +158,16 @@ def main() -> None:
         # Place tower
         if mouse_clicked and valid_placement:
             place_tower(
-                preview_x, preview_y, selected_tower_type, field, tower_map, player
+                preview_x,
+                preview_y,
+                selected_tower_type,
+                field,
+                tower_map,
+                player,
+                aura_grid,
             )
             recalculate_flow_field(field, flow_field, start, end)
+            flow_field_version += 1
             handle_enemies_backtracking(enemies, flow_field)
             valid_tile = False
 
@@ -147,31 +175,50 @@ def main() -> None:
 
         # Spawn enemy
         if spawn_new_enemy:
-            spawn_enemy(start, random.choice(list(EnemyType)), enemies, flow_field)
+            spawn_enemy(
+                start, random.choice(list(EnemyType)), enemies, registry, flow_field
+            )
 
-        update_enemies(enemies, player, flow_field, end)
-        update_towers(tower_map, enemies)
+        update_enemies(enemies, registry, player, flow_field, end, aura_grid)
+        update_towers(tower_map, enemies, registry, projectiles, aura_grid)
+        update_projectiles(projectiles, enemies, registry, aura_grid)
 
         ### RENDERING ###
         window.fill(BLACK)
         transparent_surface.fill(COLOR_KEY)
 
         render_field(window, field)
-        render_enemies(window, enemies)
+        enemy_lod = render_enemies(window, enemies, enemy_lod)
         render_towers(window, tower_map)
-        render_tower_targets(window, tower_map)
+        render_projectiles(window, projectiles)
 
 
         if valid_placement:
             # render_flow_field(window, font, preview_flow_field)
-            render_shortest_path(transparent_surface, preview_flow_field, start)
+            render_shortest_path(
+                transparent_surface,
+                preview_flow_field,
+                start,
+                PathOverlay.PREVIEW,
+                preview_flow_field_version,
+                overlay_cache,
+            )
         else:
             # render_flow_field(window, font, flow_field)
-            render_shortest_path(transparent_surface, flow_field, start)
+            render_shortest_path(
+                transparent_surface,
+                flow_field,
+                start,
+                PathOverlay.COMMITTED,
+                flow_field_version,
+                overlay_cache,
+            )
 
         if inside_field(preview_x, preview_y):
             if field[preview_y][preview_x] == Tile.TOWER:
-                render_tower_range(transparent_surface, preview_x, preview_y, tower_map)
+                render_tower_range(
+                    transparent_surface, preview_x, preview_y, tower_map, overlay_cache
+                )
             else:
                 render_preview(transparent_surface, preview_x, preview_y, valid_placement)
 
@@ -183,10 +230,157 @@ def main() -> None:
         pygame.display.flip()
 
 
+async def main_client(host: str, port: int) -> None:
+    # Same controls as main, but input is sent to a lockstep server and the
+    # state it advances is drawn instead of a local simulation
+    client = await connect(host, port)
+    client_task = asyncio.create_task(run_client(client))
+
+    preview_flow_field: FlowField = [
+        [Direction.NONE for x in range(FIELD_WIDTH)] for y in range(FIELD_HEIGHT)
+    ]
+
+    overlay_cache = OverlayCache()
+    flow_field_version = 0
+    preview_flow_field_version = 0
+    enemy_lod = False
+
+    # Resyncs replace the state and placed towers change its flow field, so
+    # either one invalidates the cached overlays and the placement preview
+    last_state_key = None
+
+    last_preview_x = -1
+    last_preview_y = -1
+    valid_tile = False
+
+    try:
+        while True:
+            ### INPUT ###
+            mouse_position = pygame.mouse.get_pos()
+            mouse_clicked = False
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    terminate()
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        terminate()
+                    if event.key == pygame.K_SPACE:
+                        enemy_type = random.choice(list(EnemyType))
+                        send_command(client, (Opcode.SPAWN, enemy_type.value, 1))
+                    if event.unicode in TOWER_TYPE_KEYS:
+                        tower_type = TOWER_TYPE_KEYS[event.unicode]
+                        send_command(client, (Opcode.SELECT, tower_type.value, 0))
+
+                if event.type == pygame.MOUSEBUTTONUP:
+                    mouse_clicked = True
+
+            state = client.state
+            if state is None:
+                await asyncio.sleep(1 / FPS)  # Waiting for the first resync
+                continue
+
+            ### LOGIC ###
+            state_key = (id(state), len(state.tower_map))
+            if state_key != last_state_key:
+                flow_field_version += 1
+                last_preview_x = -1
+                last_state_key = state_key
+
+            # Preview placement
+            preview_x = (mouse_position[0] - FIELD_OFFSET_X) // TILE_SIZE
+            preview_y = (mouse_position[1] - FIELD_OFFSET_Y) // TILE_SIZE
+
+            if preview_x != last_preview_x or preview_y != last_preview_y:
+                valid_tile = valid_tower_tile(
+                    preview_x,
+                    preview_y,
+                    state.field,
+                    preview_flow_field,
+                    state.start,
+                    state.end,
+                )
+                preview_flow_field_version += 1
+                last_preview_x = preview_x
+                last_preview_y = preview_y
+
+            valid_placement = False
+            if valid_tile:
+                valid_placement = is_tower_on_enemy(
+                    preview_x, preview_y, state.field, preview_flow_field, state.enemies
+                )
+
+            # The server checks the placement again on the tick it lands
+            if mouse_clicked and valid_placement:
+                send_command(client, (Opcode.PLACE, preview_x, preview_y))
+
+            ### RENDERING ###
+            window.fill(BLACK)
+            transparent_surface.fill(COLOR_KEY)
+
+            render_field(window, state.field)
+            enemy_lod = render_enemies(window, state.enemies, enemy_lod)
+            render_towers(window, state.tower_map)
+            render_projectiles(window, state.projectiles)
+
+            if valid_placement:
+                render_shortest_path(
+                    transparent_surface,
+                    preview_flow_field,
+                    state.start,
+                    PathOverlay.PREVIEW,
+                    preview_flow_field_version,
+                    overlay_cache,
+                )
+            else:
+                render_shortest_path(
+                    transparent_surface,
+                    state.flow_field,
+                    state.start,
+                    PathOverlay.COMMITTED,
+                    flow_field_version,
+                    overlay_cache,
+                )
+
+            if inside_field(preview_x, preview_y):
+                if state.field[preview_y][preview_x] == Tile.TOWER:
+                    render_tower_range(
+                        transparent_surface,
+                        preview_x,
+                        preview_y,
+                        state.tower_map,
+                        overlay_cache,
+                    )
+                else:
+                    render_preview(
+                        transparent_surface, preview_x, preview_y, valid_placement
+                    )
+
+            render_player_stats(window, font_big, state.player)
+
+            window.blit(transparent_surface, (0, 0))
+
+            # Sleeping instead of clock.tick lets the client receive ticks
+            await asyncio.sleep(1 / FPS)
+            pygame.display.flip()
+    finally:
+        client_task.cancel()
+        client.writer.close()
+
+
 def terminate() -> None:
     pygame.quit()
     raise SystemExit
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Tower defence")
+    parser.add_argument(
+        "--connect", metavar="HOST:PORT", help="join a lockstep server (lockstep.py)"
+    )
+    args = parser.parse_args()
+
+    if args.connect is None:
+        main()
+    else:
+        host, port = args.connect.rsplit(":", 1)
+        asyncio.run(main_client(host, int(port)))
@@ -0,0 +1,294 @@
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from aura import AuraGrid, new_aura_grid, stamp_aura
+from field import (
+    FIELD_WIDTH,
+    FIELD_HEIGHT,
+    FLOW_FIELD_DIRECTIONS,
+    Position,
+    Field,
+    Tile,
+    inside_field,
+)
+from tower import TOWER_AURA_TABLE, TOWER_STATS_TABLE, Tower, TowerMap, TowerType
+
+
+# Typehints
+Layout = list[Position]
+# Tuple format: (PATH_LENGTH, -SHORTEST_PATH_COUNT) so bigger is always better
+Score = tuple[int, int]
+
+
+def is_walkable(field: Field, x: int, y: int) -> bool:
+    return field[y][x] != Tile.BLOCKED and field[y][x] != Tile.TOWER
+
+
+def walkable_neighbours(field: Field, x: int, y: int) -> list[Position]:
+    neighbours = []
+    for direction in FLOW_FIELD_DIRECTIONS:
+        new_x = x + direction.value[0]
+        new_y = y + direction.value[1]
+        if inside_field(new_x, new_y) and is_walkable(field, new_x, new_y):
+            neighbours.append((new_x, new_y))
+    return neighbours
+
+
+def count_shortest_paths(
+    field: Field, source: Position
+) -> tuple[dict[Position, int], dict[Position, int]]:
+    # BFS that also counts how many shortest paths reach each tile from source
+    distance = {source: 0}
+    count = {source: 1}
+    queue = deque()
+    queue.append(source)
+
+    while queue:
+        tile = queue.popleft()
+        for neighbour in walkable_neighbours(field, *tile):
+            if neighbour not in distance:
+                distance[neighbour] = distance[tile] + 1
+                count[neighbour] = count[tile]
+                queue.append(neighbour)
+            elif distance[neighbour] == distance[tile] + 1:
+                count[neighbour] += count[tile]
+
+    return distance, count
+
+
+def path_score(field: Field, start: Position, end: Position) -> Score | None:
+    distance, count = count_shortest_paths(field, start)
+    if end not in distance:
+        return None
+    return (distance[end], -count[end])
+
+
+def find_cut_tiles(field: Field, start: Position, end: Position) -> set[Position]:
+    # Tiles that disconnect start from end when blocked (Tarjan articulation
+    # points, restricted to the ones separating start and end). Iterative DFS
+    # so the whole field can be walked without hitting the recursion limit.
+    discovered = {start: 0}
+    low = {start: 0}
+    parent = {start: None}
+    stack = [(start, iter(walkable_neighbours(field, *start)))]
+
+    while stack:
+        tile, neighbours = stack[-1]
+        for neighbour in neighbours:
+            if neighbour not in discovered:
+                discovered[neighbour] = low[neighbour] = len(discovered)
+                parent[neighbour] = tile
+                stack.append((neighbour, iter(walkable_neighbours(field, *neighbour))))
+                break
+            if neighbour != parent[tile]:
+                low[tile] = min(low[tile], discovered[neighbour])
+        else:
+            stack.pop()
+            if parent[tile] is not None:
+                low[parent[tile]] = min(low[parent[tile]], low[tile])
+
+    cut_tiles = set()
+    if end not in discovered:
+        return cut_tiles
+
+    # Walk the DFS tree from end back up to start. An ancestor is a cut tile if
+    # the subtree holding end has no back edge climbing above it.
+    child = end
+    tile = parent[end]
+    while tile is not None and tile != start:
+        if low[child] >= discovered[tile]:
+            cut_tiles.add(tile)
+        child = tile
+        tile = parent[tile]
+
+    return cut_tiles
+
+
+def score_candidates(
+    field: Field, start: Position, end: Position
+) -> dict[Position, Score]:
+    # Scores every empty tile in one pass. Only tiles lying on every shortest
+    # path can lengthen it, so those are the only ones that need a fresh BFS.
+    distance_start, count_start = count_shortest_paths(field, start)
+    if end not in distance_start:
+        return {}
+    distance_end, count_end = count_shortest_paths(field, end)
+
+    length = distance_start[end]
+    total = count_start[end]
+    cut_tiles = find_cut_tiles(field, start, end)
+
+    scores = {}
+    for y in range(FIELD_HEIGHT):
+        for x in range(FIELD_WIDTH):
+            tile = (x, y)
+            if field[y][x] != Tile.EMPTY or tile == start or tile == end:
+                continue
+
+            # Placing here would block the path entirely
+            if tile in cut_tiles:
+                continue
+
+            # Not on any shortest path so nothing changes
+            if (
+                tile not in distance_start
+                or tile not in distance_end
+                or distance_start[tile] + distance_end[tile] != length
+            ):
+                scores[tile] = (length, -total)
+                continue
+
+            # Removes some of the shortest paths but not all of them
+            through = count_start[tile] * count_end[tile]
+            if through < total:
+                scores[tile] = (length, through - total)
+                continue
+
+            # Bottleneck tile so path length will grow
+            field[y][x] = Tile.TOWER
+            score = path_score(field, start, end)
+            field[y][x] = Tile.EMPTY
+
+            if score is not None:
+                scores[tile] = score
+
+    return scores
+
+
+def expand_layout(
+    field: Field, layout: Layout, start: Position, end: Position, width: int
+) -> list[tuple[Score, Layout]]:
+    # Returns the best width children of layout (Top level so it can be pickled)
+    field = [row.copy() for row in field]
+    for x, y in layout:
+        field[y][x] = Tile.TOWER
+
+    scores = score_candidates(field, start, end)
+    best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:width]
+
+    return [(score, layout + [tile]) for tile, score in best]
+
+
+def optimize_layout(
+    field: Field,
+    start: Position,
+    end: Position,
+    max_towers: int,
+    beam_width: int = 1,
+    workers: int = 0,
+) -> Layout:
+    # Greedy search when beam_width is 1, beam search otherwise.
+    # Set workers to expand the beam across a process pool.
+    executor = ProcessPoolExecutor(workers) if workers > 0 else None
+
+    best_score = path_score(field, start, end)
+    best_layout = []
+    beam = [best_layout]
+
+    # The layout greedy search would be on, always kept in the beam so a wider
+    # beam never finishes below greedy
+    greedy_layout = best_layout
+
+    try:
+        for _ in range(max_towers):
+            arguments = (
+                [field] * len(beam),
+                beam,
+                [start] * len(beam),
+                [end] * len(beam),
+                [beam_width] * len(beam),
+            )
+            if executor is None:
+                results = map(expand_layout, *arguments)
+            else:
+                results = executor.map(expand_layout, *arguments)
+
+            # Merge children and drop layouts reached through different orders
+            children = {}
+            greedy_child = None
+            for parent, result in zip(beam, results):
+                if parent is greedy_layout and result:
+                    greedy_child = frozenset(result[0][1])
+                for score, layout in result:
+                    key = frozenset(layout)
+                    if key not in children or children[key][0] < score:
+                        children[key] = (score, layout)
+
+            if not children:
+                break  # No tile left that keeps the path open
+
+            ranked = sorted(children.values(), key=lambda child: child[0], reverse=True)
+            beam = [layout for _, layout in ranked[:beam_width]]
+
+            if greedy_child is not None:
+                greedy_layout = children[greedy_child][1]
+                if greedy_layout not in beam:
+                    beam.append(greedy_layout)
+
+            if ranked[0][0] > best_score:
+                best_score, best_layout = ranked[0]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return best_layout
+
+
+def load_layout(
+    layout: Layout,
+    tower_type: TowerType,
+    field: Field,
+    tower_map: TowerMap,
+    aura_grid: AuraGrid,
+) -> None:
+    # NOTE: Does not charge the player, recalculate the flow field afterwards
+    stats = TOWER_STATS_TABLE[tower_type]
+    for x, y in layout:
+        tower_map[(x, y)] = Tower(tower_type, *stats)
+        field[y][x] = Tile.TOWER
+
+        if tower_type in TOWER_AURA_TABLE:
+            stamp_aura(aura_grid, x, y, stats[2], *TOWER_AURA_TABLE[tower_type])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Search for a maze layout")
+    parser.add_argument("--budget", type=int, default=60)
+    parser.add_argument(
+        "--tower-type", choices=[t.name for t in TowerType], default="BASIC"
+    )
+    parser.add_argument("--beam-width", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=0)
+    args = parser.parse_args()
+
+    start: Position = (0, FIELD_HEIGHT // 2)
+    end: Position = (FIELD_WIDTH - 1, FIELD_HEIGHT // 2)
+    field: Field = [
+        [Tile.EMPTY for x in range(FIELD_WIDTH)] for y in range(FIELD_HEIGHT)
+    ]
+
+    tower_type = TowerType[args.tower_type]
+    max_towers = args.budget // TOWER_STATS_TABLE[tower_type][0]
+    layout = optimize_layout(
+        field, start, end, max_towers, args.beam_width, args.workers
+    )
+
+    tower_map: TowerMap = {}
+    load_layout(layout, tower_type, field, tower_map, new_aura_grid())
+
+    print(f"Towers: {len(layout)}")
+    print(f"Path length: {path_score(field, start, end)[0]}")
+    print(f"Layout: {layout}")
+    for y in range(FIELD_HEIGHT):
+        row = ""
+        for x in range(FIELD_WIDTH):
+            if (x, y) == start or (x, y) == end:
+                row += "@"
+            else:
+                row += "#" if field[y][x] == Tile.TOWER else "."
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from aura import AuraGrid, get_tile_index
+from entity import EntityRegistry
+from enemy import Enemy, EnemyList
+from field import FIELD_WIDTH, FIELD_HEIGHT
+
+
+PROJECTILE_CAPACITY = 4096
+
+
+@dataclass
+class Projectiles:
+    # Struct of numpy arrays, slot i of every array belongs to the same
+    # projectile so a tick moves and resolves every slot in flight at once
+    x: np.ndarray
+    y: np.ndarray
+    velocity_x: np.ndarray
+    velocity_y: np.ndarray
+    aim_x: np.ndarray
+    aim_y: np.ndarray
+    ticks_left: np.ndarray
+    damage: np.ndarray
+    splash_radius: np.ndarray
+    # Handle of the enemy being homed in on, index -1 for no target
+    target_index: np.ndarray
+    target_generation: np.ndarray
+
+    # Slots currently in flight (in spawn order) and slots ready for reuse
+    active: list[int]
+    free: list[int]
+
+
+def new_projectiles(capacity: int = PROJECTILE_CAPACITY) -> Projectiles:
+    return Projectiles(
+        np.zeros(capacity),
+        np.zeros(capacity),
+        np.zeros(capacity),
+        np.zeros(capacity),
+        np.zeros(capacity),
+        np.zeros(capacity),
+        np.zeros(capacity, np.int32),
+        np.zeros(capacity),
+        np.zeros(capacity),
+        np.zeros(capacity, np.int32),
+        np.zeros(capacity, np.int32),
+        [],
+        list(range(capacity - 1, -1, -1)),
+    )
+
+
+def spawn_projectile(
+    projectiles: Projectiles,
+    x: float,
+    y: float,
+    target: Enemy,
+    speed: float,
+    splash_radius: float,
+    damage: float,
+    aura_grid: AuraGrid,
+) -> bool:
+    # Returns False when every slot is in flight
+    if not projectiles.free:
+        return False
+
+    # Lead the target by however far it moves while the projectile travels
+    target_speed = (
+        target.speed * aura_grid.speed_multiplier[get_tile_index(target.x, target.y)]
+    )
+    ticks = max(1, math.ceil(math.dist((x, y), (target.x, target.y)) / speed))
+    aim_x = target.x + target.move_direction.value[0] * target_speed * ticks
+    aim_y = target.y + target.move_direction.value[1] * target_speed * ticks
+    ticks = max(1, math.ceil(math.dist((x, y), (aim_x, aim_y)) / speed))
+
+    i = projectiles.free.pop()
+    projectiles.x[i] = x
+    projectiles.y[i] = y
+    projectiles.velocity_x[i] = (aim_x - x) / ticks
+    projectiles.velocity_y[i] = (aim_y - y) / ticks
+    projectiles.aim_x[i] = aim_x
+    projectiles.aim_y[i] = aim_y
+    projectiles.ticks_left[i] = ticks
+    projectiles.damage[i] = damage
+    projectiles.splash_radius[i] = splash_radius
+    projectiles.target_index[i], projectiles.target_generation[i] = target.handle
+    projectiles.active.append(i)
+
+    return True
+
+
+def update_projectiles(
+    projectiles: Projectiles,
+    enemies: EnemyList,
+    registry: EntityRegistry,
+    aura_grid: AuraGrid,
+) -> None:
+    if not projectiles.active:
+        return
+
+    slots = np.array(projectiles.active, np.intp)
+    ticks = projectiles.ticks_left[slots] - 1
+    projectiles.ticks_left[slots] = ticks
+
+    # One row per enemy, built once a tick so everything after works on arrays
+    # Tuple format: (X, Y, SPEED, DIRECTION_X, DIRECTION_Y, ENTITY_INDEX)
+    enemy_table = np.array(
+        [
+            (
+                enemy.x,
+                enemy.y,
+                enemy.speed,
+                *enemy.move_direction.value,
+                enemy.handle[0],
+            )
+            for enemy in enemies
+        ]
+    ).reshape(-1, 6)
+    enemy_x = enemy_table[:, 0]
+    enemy_y = enemy_table[:, 1]
+
+    # Row of every live entity in enemy_table
+    enemy_rows = np.full(len(registry.generations), -1, np.intp)
+    enemy_rows[enemy_table[:, 5].astype(np.intp)] = np.arange(len(enemies))
+
+    # Keep homing while the target is alive, otherwise fly to the last aim
+    targets = projectiles.target_index[slots]
+    targeted = np.flatnonzero(targets >= 0)
+    generations = np.array(registry.generations, np.int64)
+    alive = (
+        generations[targets[targeted]] == projectiles.target_generation[slots[targeted]]
+    )
+    projectiles.target_index[slots[targeted[~alive]]] = -1
+
+    homing = targeted[alive]
+    homing = homing[ticks[homing] > 0]
+    if len(homing):
+        homing_slots = slots[homing]
+        homing_ticks = ticks[homing]
+        rows = enemy_rows[targets[homing]]
+
+        # Slowed enemies cover less ground, so lead by their aura speed
+        tiles = get_tile_indices(enemy_x[rows], enemy_y[rows])
+        speed_multiplier = np.array(aura_grid.speed_multiplier)[tiles]
+        lead = enemy_table[rows, 2] * speed_multiplier * homing_ticks
+
+        aim_x = enemy_x[rows] + enemy_table[rows, 3] * lead
+        aim_y = enemy_y[rows] + enemy_table[rows, 4] * lead
+        projectiles.aim_x[homing_slots] = aim_x
+        projectiles.aim_y[homing_slots] = aim_y
+        velocity_x = (aim_x - projectiles.x[homing_slots]) / (homing_ticks + 1)
+        velocity_y = (aim_y - projectiles.y[homing_slots]) / (homing_ticks + 1)
+        projectiles.velocity_x[homing_slots] = velocity_x
+        projectiles.velocity_y[homing_slots] = velocity_y
+
+    # Integrate every projectile still in flight in one step
+    flying = slots[ticks > 0]
+    projectiles.x[flying] += projectiles.velocity_x[flying]
+    projectiles.y[flying] += projectiles.velocity_y[flying]
+    projectiles.active = flying.tolist()
+
+    impacts = slots[ticks <= 0]
+    projectiles.free.extend(impacts.tolist())
+    if not len(impacts) or not enemies:
+        return
+
+    resolve_impacts(
+        enemies,
+        enemy_x,
+        enemy_y,
+        projectiles.aim_x[impacts],
+        projectiles.aim_y[impacts],
+        projectiles.splash_radius[impacts],
+        projectiles.damage[impacts],
+    )
+
+
+def get_tile_indices(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    # Same as aura.get_tile_index for a whole array of positions
+    tile_x = np.floor(x + 0.5).astype(np.intp)
+    tile_y = np.floor(y + 0.5).astype(np.intp)
+    return tile_y * FIELD_WIDTH + tile_x
+
+
+def resolve_impacts(
+    enemies: EnemyList,
+    enemy_x: np.ndarray,
+    enemy_y: np.ndarray,
+    impact_x: np.ndarray,
+    impact_y: np.ndarray,
+    radius: np.ndarray,
+    damage: np.ndarray,
+) -> None:
+    # Sort enemies by tile so each tile's enemies are one run of enemy_order
+    enemy_tiles = get_tile_indices(enemy_x, enemy_y)
+    enemy_order = np.argsort(enemy_tiles, kind="stable")
+    tile_counts = np.bincount(enemy_tiles, minlength=FIELD_WIDTH * FIELD_HEIGHT)
+    tile_starts = np.cumsum(tile_counts) - tile_counts
+
+    # Tiles the splash of each impact can reach, clipped to the field
+    low_x = np.maximum(np.floor(impact_x - radius + 0.5).astype(np.intp), 0)
+    low_y = np.maximum(np.floor(impact_y - radius + 0.5).astype(np.intp), 0)
+    high_x = np.minimum(
+        np.floor(impact_x + radius + 0.5).astype(np.intp), FIELD_WIDTH - 1
+    )
+    high_y = np.minimum(
+        np.floor(impact_y + radius + 0.5).astype(np.intp), FIELD_HEIGHT - 1
+    )
+    reach = math.ceil(2 * radius.max())
+
+    # Pair every impact with every enemy on those tiles, one pass per tile
+    # offset rather than one per impact
+    pair_impacts = []
+    pair_enemies = []
+    for offset_y in range(reach + 1):
+        for offset_x in range(reach + 1):
+            tile_x = low_x + offset_x
+            tile_y = low_y + offset_y
+            impacts = np.flatnonzero((tile_x <= high_x) & (tile_y <= high_y))
+            tiles = tile_y[impacts] * FIELD_WIDTH + tile_x[impacts]
+            counts = tile_counts[tiles]
+
+            # Repeat each impact once per enemy on its tile and walk that run
+            pair_impacts.append(np.repeat(impacts, counts))
+            run_offsets = np.repeat(
+                tile_starts[tiles] - (np.cumsum(counts) - counts), counts
+            )
+            pair_enemies.append(
+                enemy_order[run_offsets + np.arange(len(pair_impacts[-1]))]
+            )
+
+    pair_impacts = np.concatenate(pair_impacts)
+    pair_enemies = np.concatenate(pair_enemies)
+    hits = (enemy_x[pair_enemies] - impact_x[pair_impacts]) ** 2 + (
+        enemy_y[pair_enemies] - impact_y[pair_impacts]
+    ) ** 2 <= radius[pair_impacts] ** 2
+
+    # Splash damage summed per enemy, only enemies that were hit are touched
+    damage_taken = np.bincount(
+        pair_enemies[hits], damage[pair_impacts[hits]], len(enemies)
+    )
+    hit_enemies = np.flatnonzero(damage_taken)
+    for i, amount in zip(hit_enemies.tolist(), damage_taken[hit_enemies].tolist()):
+        enemies[i].health -= amount
@@ -1,6 +1,8 @@
 import pygame
+from dataclasses import dataclass, field as dataclass_field
+from enum import Enum, auto
 
-from constants import WINDOW_WIDTH, WINDOW_HEIGHT
+from constants import WINDOW_WIDTH, WINDOW_HEIGHT, COLOR_KEY
 from field import (
     FIELD_WIDTH,
     FIELD_HEIGHT,
@@ -15,7 +17,8 @@ from field import (
 )
 from tower import TowerMap, TowerType
 from player import Player
-from enemy import EnemyList, EnemyType
+from enemy import ENEMY_STATS_TABLE, EnemyList, EnemyType
+from projectile import Projectiles
 
 
 # Positioning offsets
@@ -47,6 +50,45 @@ LINE_WIDTH = TILE_SIZE // 8
 HALF_LINE_WIDTH = LINE_WIDTH // 2
 
 
+# Enemy level of detail
+# Above ENTER enemies draw a per tile heatmap instead of every enemy, and only
+# go back to drawing every enemy below EXIT so counts near the limit don't flicker
+ENEMY_LOD_ENTER_THRESHOLD = 500
+ENEMY_LOD_EXIT_THRESHOLD = 400
+# Enemies on one tile needed for the heatmap to be fully opaque
+ENEMY_LOD_DENSITY_CAP = 20
+ENEMY_LOD_MIN_ALPHA = 64
+
+FIELD_SIZE = (FIELD_WIDTH * TILE_SIZE, FIELD_HEIGHT * TILE_SIZE)
+
+# One pixel per tile, scaled up to the field when drawn
+enemy_heatmap = pygame.Surface((FIELD_WIDTH, FIELD_HEIGHT), pygame.SRCALPHA)
+enemy_heatmap_scaled = pygame.Surface(FIELD_SIZE, pygame.SRCALPHA)
+
+ENEMY_INVERSE_MAX_HEALTH: dict[EnemyType, float] = {
+    enemy_type: 1 / ENEMY_STATS_TABLE[enemy_type][0] for enemy_type in list(EnemyType)
+}
+
+
+class PathOverlay(Enum):
+    COMMITTED = auto()  # Path enemies follow now
+    PREVIEW = auto()  # Path if the hovered tile became a tower
+
+
+@dataclass
+class OverlayCache:
+    # One shortest path per overlay, replaced when its flow field version moves
+    # Tuple format: (FLOW_FIELD_VERSION, POINTS)
+    shortest_paths: dict[PathOverlay, tuple[int, list[Position]]] = dataclass_field(
+        default_factory=dict
+    )
+
+    # Range circle of the hovered tower
+    # Tuple format: (X, Y, TOWER_TYPE)
+    tower_range_key: tuple = None
+    tower_range_surface: pygame.Surface = None
+
+
 def get_screen_tile_corner(x: int, y: int) -> Position:
     return (
         x * TILE_SIZE + FIELD_OFFSET_X,
@@ -96,7 +138,22 @@ def render_flow_field(
             surface.blit(text, get_screen_tile_corner(x, y))
 
 
-def render_enemies(surface: pygame.Surface, enemies: EnemyList) -> None:
+# Returns whether the heatmap was drawn, pass it back in as lod next frame
+def render_enemies(surface: pygame.Surface, enemies: EnemyList, lod: bool) -> bool:
+    if lod:
+        lod = len(enemies) >= ENEMY_LOD_EXIT_THRESHOLD
+    else:
+        lod = len(enemies) > ENEMY_LOD_ENTER_THRESHOLD
+
+    if lod:
+        render_enemy_heatmap(surface, enemies)
+    else:
+        render_enemy_sprites(surface, enemies)
+
+    return lod
+
+
+def render_enemy_sprites(surface: pygame.Surface, enemies: EnemyList) -> None:
     for enemy in enemies:
         enemy_center = get_screen_tile_center(enemy.x, enemy.y)
 
@@ -117,6 +174,36 @@ def render_enemies(surface: pygame.Surface, enemies: EnemyList) -> None:
         pygame.draw.circle(surface, colour, enemy_center, radius, LINE_WIDTH)
 
 
+def render_enemy_heatmap(surface: pygame.Surface, enemies: EnemyList) -> None:
+    # Aggregate enemies per tile then draw the whole field in one blit
+    # Alpha shows density and colour goes from yellow to red as health drops
+    # Kept to the bare minimum as it runs once per enemy every frame
+    counts = [0] * (FIELD_WIDTH * FIELD_HEIGHT)
+    health = [0.0] * (FIELD_WIDTH * FIELD_HEIGHT)
+    inverse_max_health = ENEMY_INVERSE_MAX_HEALTH
+    for enemy in enemies:
+        i = int(enemy.y + 0.5) * FIELD_WIDTH + int(enemy.x + 0.5)
+        counts[i] += 1
+        health[i] += enemy.health * inverse_max_health[enemy.enemy_type]
+
+    enemy_heatmap.fill((0, 0, 0, 0))
+    for y in range(FIELD_HEIGHT):
+        for x in range(FIELD_WIDTH):
+            count = counts[y * FIELD_WIDTH + x]
+            if count == 0:
+                continue
+
+            health_percent = min(max(health[y * FIELD_WIDTH + x] / count, 0), 1)
+            alpha = max(
+                ENEMY_LOD_MIN_ALPHA,
+                255 * min(count, ENEMY_LOD_DENSITY_CAP) // ENEMY_LOD_DENSITY_CAP,
+            )
+            enemy_heatmap.set_at((x, y), (255, int(255 * health_percent), 0, alpha))
+
+    pygame.transform.scale(enemy_heatmap, FIELD_SIZE, enemy_heatmap_scaled)
+    surface.blit(enemy_heatmap_scaled, (FIELD_OFFSET_X, FIELD_OFFSET_Y))
+
+
 def render_towers(surface: pygame.Surface, tower_map: TowerMap) -> None:
     for tower_position, tower in tower_map.items():
         tile_center = get_screen_tile_center(*tower_position)
@@ -128,38 +215,54 @@ def render_towers(surface: pygame.Surface, tower_map: TowerMap) -> None:
                 colour = BLUE
             case TowerType.SPEEDY:
                 colour = RED
+            case TowerType.SLOW:
+                colour = CYAN
+            case TowerType.POISON:
+                colour = GREEN
+            case TowerType.BUFF:
+                colour = YELLOW
             case _:
                 colour = MAGENTA
 
         pygame.draw.circle(surface, colour, tile_center, HALF_TILE_SIZE, LINE_WIDTH)
 
 
-def render_tower_targets(surface: pygame.Surface, tower_map: TowerMap) -> None:
-    for tower_position, tower in tower_map.items():
-        if tower.target is None:
-            continue
-
-        start_pos = get_screen_tile_center(*tower_position)
-        end_pos = get_screen_tile_center(tower.target.x, tower.target.y)
-
-        if tower.reload_timer == tower.reload_speed:
-            colour = YELLOW
-        else:
-            colour = GREY
-
-        pygame.draw.line(surface, colour, start_pos, end_pos, LINE_WIDTH)
+def render_projectiles(surface: pygame.Surface, projectiles: Projectiles) -> None:
+    for i in projectiles.active:
+        center = get_screen_tile_center(projectiles.x[i], projectiles.y[i])
+        pygame.draw.circle(surface, YELLOW, center, LINE_WIDTH)
 
 
 def render_tower_range(
-    transparent_surface: pygame.Surface, x: int, y: int, tower_map: TowerMap
+    transparent_surface: pygame.Surface,
+    x: int,
+    y: int,
+    tower_map: TowerMap,
+    cache: OverlayCache,
 ) -> None:
     tower = tower_map[(x, y)]
-    pygame.draw.circle(
-        transparent_surface,
-        WHITE,
-        get_screen_tile_center(x, y),
-        tower.range * TILE_SIZE,
-        HALF_LINE_WIDTH,
+    radius = tower.range * TILE_SIZE
+
+    # Only rebuild the circle when hovering a different tower
+    key = (x, y, tower.tower_type)
+    if cache.tower_range_key != key:
+        size = int(radius * 2) + LINE_WIDTH
+        cache.tower_range_surface = pygame.Surface((size, size))
+        cache.tower_range_surface.fill(COLOR_KEY)
+        cache.tower_range_surface.set_colorkey(COLOR_KEY)
+        pygame.draw.circle(
+            cache.tower_range_surface,
+            WHITE,
+            (size // 2, size // 2),
+            radius,
+            HALF_LINE_WIDTH,
+        )
+        cache.tower_range_key = key
+
+    center_x, center_y = get_screen_tile_center(x, y)
+    half_size = cache.tower_range_surface.get_width() // 2
+    transparent_surface.blit(
+        cache.tower_range_surface, (center_x - half_size, center_y - half_size)
     )
 
 
@@ -186,11 +289,9 @@ def render_preview(
         )
 
 
-def render_shortest_path(
-    transparent_surface: pygame.Surface, flow_field: FlowField, start: Position
-) -> None:
+def get_shortest_path_points(flow_field: FlowField, start: Position) -> list[Position]:
     x, y = start
-    tile_from = get_screen_tile_center(x, y)
+    points = [get_screen_tile_center(x, y)]
     while True:
         direction = flow_field[y][x]
 
@@ -200,6 +301,25 @@ def render_shortest_path(
         x += direction.value[0]
         y += direction.value[1]
 
-        tile_to = get_screen_tile_center(x, y)
-        pygame.draw.line(transparent_surface, YELLOW, tile_from, tile_to, LINE_WIDTH)
-        tile_from = tile_to
+        points.append(get_screen_tile_center(x, y))
+
+    return points
+
+
+# NOTE: Bump version whenever flow_field is recalculated
+def render_shortest_path(
+    transparent_surface: pygame.Surface,
+    flow_field: FlowField,
+    start: Position,
+    overlay: PathOverlay,
+    version: int,
+    cache: OverlayCache,
+) -> None:
+    cached = cache.shortest_paths.get(overlay)
+    if cached is None or cached[0] != version:
+        cached = (version, get_shortest_path_points(flow_field, start))
+        cache.shortest_paths[overlay] = cached
+
+    points = cached[1]
+    if len(points) > 1:
+        pygame.draw.lines(transparent_surface, YELLOW, False, points, LINE_WIDTH)
@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 from enum import Enum, auto
 
+from aura import AuraGrid, get_tile_index, stamp_aura
 from constants import DT
 from field import (
     Position,
@@ -11,14 +12,19 @@ from field import (
     inside_field,
     recalculate_flow_field,
 )
+from entity import EntityRegistry, Handle, get_entity
 from enemy import EnemyList, Enemy
 from player import Player
+from projectile import Projectiles, spawn_projectile
 
 
 class TowerType(Enum):
     BASIC = auto()
     HEAVY = auto()
     SPEEDY = auto()
+    SLOW = auto()
+    POISON = auto()
+    BUFF = auto()
 
 
 # Tuple format: (BUY_VALUE, SELL_VALUE, RANGE, RELOAD_SPEED, DAMAGE)
@@ -26,6 +32,26 @@ TOWER_STATS_TABLE: dict[TowerType, tuple] = {
     TowerType.BASIC: (3, 2, 2.5, 0.1, 0.2),
     TowerType.HEAVY: (20, 15, 6.0, 0.2, 1),
     TowerType.SPEEDY: (10, 5, 3.5, 0.025, 0.3),
+    TowerType.SLOW: (15, 10, 2.0, 0, 0),
+    TowerType.POISON: (15, 10, 1.5, 0, 0),
+    TowerType.BUFF: (25, 15, 1.5, 0, 0),
+}
+
+# Tuple format: (PROJECTILE_SPEED, SPLASH_RADIUS)
+# PROJECTILE_SPEED is in tiles per tick, SPLASH_RADIUS is in tiles
+TOWER_PROJECTILE_TABLE: dict[TowerType, tuple] = {
+    TowerType.BASIC: (0.25, 0.5),
+    TowerType.HEAVY: (0.15, 1.25),
+    TowerType.SPEEDY: (0.4, 0.5),
+}
+
+# Towers in this table never fire, they stamp an aura over their RANGE instead
+# Tuple format: (SLOW, DAMAGE_PER_TICK, DAMAGE_BUFF)
+# SLOW and DAMAGE_BUFF are fractions, auras of the same kind stack additively
+TOWER_AURA_TABLE: dict[TowerType, tuple] = {
+    TowerType.SLOW: (0.3, 0, 0),
+    TowerType.POISON: (0, 0.02, 0),
+    TowerType.BUFF: (0, 0, 0.25),
 }
 
 TOWER_RANGE_SQUARED: dict[TowerType, float] = {
@@ -42,7 +68,7 @@ class Tower:
     reload_speed: float
     damage: float
 
-    target: Enemy = None
+    target: Handle = None
     reload_timer: float = 0
 
 
@@ -57,6 +83,7 @@ def place_tower(
     field: Field,
     tower_map: TowerMap,
     player: Player,
+    aura_grid: AuraGrid,
 ) -> None:
     stats = TOWER_STATS_TABLE[tower_type]
     tower = Tower(tower_type, *stats)
@@ -67,6 +94,31 @@ def place_tower(
     tower_map[(x, y)] = tower
     field[y][x] = Tile.TOWER
 
+    if tower_type in TOWER_AURA_TABLE:
+        stamp_aura(aura_grid, x, y, tower.range, *TOWER_AURA_TABLE[tower_type])
+
+
+# NOTE: Recalculate the flow field afterwards as the tile is walkable again
+def remove_tower(
+    x: int,
+    y: int,
+    field: Field,
+    tower_map: TowerMap,
+    player: Player,
+    aura_grid: AuraGrid,
+) -> None:
+    tower = tower_map.pop((x, y))
+
+    # Refund sell price to player money
+    player.money += tower.sell_value
+
+    field[y][x] = Tile.EMPTY
+
+    if tower.tower_type in TOWER_AURA_TABLE:
+        stamp_aura(
+            aura_grid, x, y, tower.range, *TOWER_AURA_TABLE[tower.tower_type], sign=-1
+        )
+
 
 # NOTE: Only call valid_tower_tile on frame if (x, y) changes or field has changed
 def valid_tower_tile(
@@ -129,41 +181,55 @@ def is_tower_on_enemy(
     return valid
 
 
-def update_towers(tower_map: TowerMap, enemies: EnemyList) -> None:
+def update_towers(
+    tower_map: TowerMap,
+    enemies: EnemyList,
+    registry: EntityRegistry,
+    projectiles: Projectiles,
+    aura_grid: AuraGrid,
+) -> None:
     for tower_position, tower in tower_map.items():
-        # If tower has no target find a target
-        if tower.target is None:
-            find_new_target(*tower_position, tower, enemies)
+        # Aura towers only act through the aura grid
+        if tower.tower_type in TOWER_AURA_TABLE:
+            continue
 
-        # Check if still in range or dead
-        else:
-            if tower.target.health <= 0 or not in_range(
-                *tower_position,
-                tower.target.x,
-                tower.target.y,
-                TOWER_RANGE_SQUARED[tower.tower_type]
-            ):
-                tower.target = None
-                find_new_target(*tower_position, tower, enemies)
+        # Stale handle means the target is dead or has reached the end
+        target = get_entity(registry, tower.target)
+
+        # Check if still in range
+        if target is None or not in_range(
+            *tower_position, target.x, target.y, TOWER_RANGE_SQUARED[tower.tower_type]
+        ):
+            tower.target = None
+            target = find_new_target(*tower_position, tower, enemies)
 
         tower.reload_timer -= DT
 
-        # Deal damage
-        if tower.target is not None and tower.reload_timer <= 0:
-            tower.target.health -= tower.damage
-            tower.reload_timer = tower.reload_speed
+        # Fire a projectile, damage is dealt when it lands
+        if target is not None and tower.reload_timer <= 0:
+            if spawn_projectile(
+                projectiles,
+                *tower_position,
+                target,
+                *TOWER_PROJECTILE_TABLE[tower.tower_type],
+                tower.damage * (1 + aura_grid.buff[get_tile_index(*tower_position)]),
+                aura_grid,
+            ):
+                tower.reload_timer = tower.reload_speed
 
 
 def find_new_target(
     tower_x: int, tower_y: int, tower: Tower, enemies: EnemyList
-) -> bool:
+) -> Enemy:
     for enemy in enemies:
         # Found a target
         if in_range(
             tower_x, tower_y, enemy.x, enemy.y, TOWER_RANGE_SQUARED[tower.tower_type]
         ):
-            tower.target = enemy
-            break
+            tower.target = enemy.handle
+            return enemy
+
+    return None
 
 
 def in_range(